@@ -9,8 +9,8 @@ from typing import List
 
 from marvin.config import load_config, ConfigError
 from marvin.core import Collector, Sink, LogEvent
-from marvin.collectors import WindowsEVTXCollector, LinuxSyslogCollector, LinuxJournaldCollector, FileTailCollector, CommandCollector, WindowsRegistryCollector
-from marvin.sinks import StdoutSink, FileSink, HTTPSink
+from marvin.collectors import WindowsEVTXCollector, LinuxSyslogCollector, LinuxJournaldCollector, FileTailCollector, CommandCollector, WindowsRegistryCollector, RelayCollector
+from marvin.sinks import StdoutSink, FileSink, HTTPSink, RelaySink
 
 async def run_collector(collector: Collector, sinks: List[Sink]):
     """
@@ -48,6 +48,8 @@ async def main():
             sinks.append(FileSink(sink_cfg))
         elif stype == 'http':
             sinks.append(HTTPSink(sink_cfg))
+        elif stype == 'relay':
+            sinks.append(RelaySink(sink_cfg))
         else:
             print(f"Warning: Unknown sink type '{stype}'")
 
@@ -71,6 +73,8 @@ async def main():
             collectors.append(CommandCollector(source_cfg))
         elif stype == 'windows_registry':
             collectors.append(WindowsRegistryCollector(source_cfg))
+        elif stype == 'relay':
+            collectors.append(RelayCollector(source_cfg))
         else:
             print(f"Warning: Unknown source type '{stype}'")
 
@@ -2,4 +2,5 @@ from .windows import WindowsEVTXCollector, WindowsRegistryCollector
 from .linux import LinuxSyslogCollector, LinuxJournaldCollector
 from .file import FileTailCollector
 from .command import CommandCollector
+from .relay import RelayCollector
 
@@ -0,0 +1,194 @@
+import asyncio
+import datetime
+import hashlib
+import hmac
+from typing import AsyncGenerator, Dict, Any, Optional, Set, Tuple
+
+from marvin.core import Collector, LogEvent
+from marvin import relay
+
+class RelayCollector(Collector):
+    """
+    Aggregator side of the relay transport. Accepts connections from any
+    number of agents running a relay sink and yields their events.
+    If auth_token is set, agents must present the same token in their HELLO.
+
+    Every event is tagged with the agent, session, batch sequence and batch
+    digest it arrived in. Per agent session, batch digests are also folded into
+    a running SHA-256 chain so the order of accepted batches can be verified.
+    """
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.listen_host = config.get('host', '127.0.0.1')
+        self.port = config.get('port', 5140)
+        self.backlog = config.get('backlog', 1024)
+        self.max_frame_size = config.get('max_frame_size', relay.DEFAULT_MAX_FRAME_SIZE)
+        self.max_batch_size = config.get('max_batch_size', relay.DEFAULT_MAX_BATCH_SIZE)
+        self.timeout = config.get('timeout', 10)
+        self.auth_token = config.get('auth_token')
+        self.session_ttl = config.get('session_ttl', 3600)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=config.get('queue_size', 10000))
+
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.connections: Set[asyncio.StreamWriter] = set()
+        self.agents: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    async def start(self):
+        if self.server is None:
+            self.server = await asyncio.start_server(
+                self._handle_agent,
+                self.listen_host,
+                self.port,
+                backlog=self.backlog
+            )
+            print(f"Relay listening on {self.listen_host}:{self.port}")
+
+    async def collect(self) -> AsyncGenerator[LogEvent, None]:
+        if self.server is None:
+            await self.start()
+
+        while True:
+            yield await self.queue.get()
+
+    def _agent_state(self, hello: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Returns the custody state for an agent session, creating it on first contact.
+        Keyed by session as well as agent ID, since agent IDs default to hostnames and can collide.
+        """
+        self._expire_sessions()
+        agent_id = hello['agent_id']
+        session = hello.get('session', '')
+        state = self.agents.get((agent_id, session))
+        if state is None:
+            state = {
+                "last_sequence": 0,
+                "last_digest": None,
+                "chain": hashlib.sha256(f"{agent_id}:{session}".encode('utf-8')).hexdigest(),
+                "lock": asyncio.Lock(),
+                "writer": None,
+                "idle_since": None
+            }
+            self.agents[(agent_id, session)] = state
+        return state
+
+    def _expire_sessions(self):
+        """
+        Forgets sessions that have had no connection for session_ttl seconds.
+        Resends from an expired session are no longer recognized as duplicates.
+        """
+        now = asyncio.get_running_loop().time()
+        expired = [
+            key for key, state in self.agents.items()
+            if state['idle_since'] is not None
+            and not state['lock'].locked()
+            and now - state['idle_since'] > self.session_ttl
+        ]
+        for key in expired:
+            del self.agents[key]
+
+    async def _handle_agent(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections.add(writer)
+        peername = writer.get_extra_info('peername')
+        peer = f"{peername[0]}:{peername[1]}" if peername else "unknown"
+        agent_id = None
+        state = None
+        try:
+            frame_type, payload = await asyncio.wait_for(
+                relay.read_frame(reader, self.max_frame_size),
+                timeout=self.timeout
+            )
+            if frame_type != relay.FRAME_HELLO:
+                raise relay.RelayProtocolError(f"Expected HELLO, got frame type {frame_type}")
+            hello = relay.decode_hello(payload)
+            if self.auth_token and not hmac.compare_digest(
+                    str(hello.get('auth_token', '')).encode('utf-8'), str(self.auth_token).encode('utf-8')):
+                # Retryable, so a misconfigured agent keeps its events until the token is fixed
+                writer.write(relay.encode_nack(0, "Authentication failed", permanent=False))
+                await writer.drain()
+                raise relay.RelayProtocolError(f"Authentication failed for agent '{hello['agent_id']}'")
+            agent_id = hello['agent_id']
+            session = hello.get('session', '')
+            state = self._agent_state(hello)
+
+            # The agent only reconnects after giving up on its previous connection
+            previous = state['writer']
+            if previous is not None and previous is not writer:
+                previous.close()
+            state['writer'] = writer
+            state['idle_since'] = None
+
+            while True:
+                try:
+                    frame_type, payload = await relay.read_frame(reader, self.max_frame_size)
+                    if frame_type != relay.FRAME_BATCH:
+                        raise relay.RelayProtocolError(f"Expected BATCH, got frame type {frame_type}")
+                    sequence, digest, events = relay.decode_batch(payload, self.max_batch_size)
+                except relay.FrameTooLargeError as e:
+                    if e.frame_type != relay.FRAME_BATCH:
+                        raise
+                    sequence = relay.peek_sequence(await relay.discard_payload(reader, e.length))
+                    print(f"Rejecting batch from relay agent {agent_id} ({peer}): {e}")
+                    writer.write(relay.encode_nack(sequence, str(e)))
+                    await writer.drain()
+                    continue
+                except relay.RelayRejectedError as e:
+                    print(f"Rejecting batch from relay agent {agent_id} ({peer}): {e}")
+                    writer.write(relay.encode_nack(relay.peek_sequence(payload), str(e), e.permanent))
+                    await writer.drain()
+                    continue
+
+                # Serialize batches per session so a resend arriving on a new connection
+                # waits for the original to be fully accepted instead of racing it
+                async with state['lock']:
+                    if sequence == state['last_sequence'] and digest == state['last_digest']:
+                        # Resend of a batch whose ACK was lost; it has already been accepted
+                        reply = relay.encode_ack(sequence, digest)
+                    elif sequence <= state['last_sequence']:
+                        # A correct agent only ever resends its latest batch
+                        reason = f"Sequence {sequence} already used (latest accepted is {state['last_sequence']})"
+                        print(f"Rejecting batch from relay agent {agent_id} ({peer}): {reason}")
+                        reply = relay.encode_nack(sequence, reason)
+                    else:
+                        state['chain'] = hashlib.sha256((state['chain'] + digest).encode('utf-8')).hexdigest()
+                        provenance = {
+                            "agent_id": agent_id,
+                            "session": session,
+                            "peer": peer,
+                            "batch_sequence": sequence,
+                            "batch_sha256": digest,
+                            "chain_sha256": state['chain'],
+                            "received_at": datetime.datetime.now().isoformat()
+                        }
+                        for event in events:
+                            if self.should_collect(event.message):
+                                # A list so events relayed through several tiers keep every hop
+                                event.raw_data.setdefault('relay_provenance', []).append(provenance)
+                                await self.queue.put(event)
+
+                        state['last_sequence'] = sequence
+                        state['last_digest'] = digest
+                        reply = relay.encode_ack(sequence, digest)
+
+                writer.write(reply)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.CancelledError):
+            # Agent disconnected, or the aggregator is shutting down. Cancellation is not
+            # re-raised because on Python 3.11 start_server's done-callback logs a traceback
+            # for every cancelled handler; the finally block does the cleanup either way.
+            pass
+        except (OSError, asyncio.TimeoutError, relay.RelayProtocolError) as e:
+            print(f"Error on relay connection from {agent_id or 'unknown agent'} ({peer}): {e}")
+        finally:
+            if state is not None and state['writer'] is writer:
+                state['writer'] = None
+                state['idle_since'] = asyncio.get_running_loop().time()
+            self.connections.discard(writer)
+            writer.close()
+
+    async def close(self):
+        if self.server:
+            self.server.close()
+            for writer in list(self.connections):
+                writer.close()
+            await self.server.wait_closed()
+            self.server = None
@@ -15,17 +15,46 @@ class LogEvent:
     message: str
     raw_data: Dict[str, Any] = dataclasses.field(default_factory=dict)
 
-    def to_json(self) -> str:
+    def to_dict(self) -> Dict[str, Any]:
         """
-        Convert the event to a JSON string.
+        Convert the event to a JSON-serializable dictionary.
         """
-        return json.dumps({
+        return {
             "timestamp": self.timestamp.isoformat(),
             "source_type": self.source_type,
             "host": self.host,
             "message": self.message,
             "raw_data": self.raw_data
-        })
+        }
+
+    def to_json(self) -> str:
+        """
+        Convert the event to a JSON string.
+        """
+        return json.dumps(self.to_dict())
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LogEvent":
+        """
+        Rebuild an event from the dictionary produced by to_dict().
+        Raises TypeError or ValueError if the dictionary is malformed.
+        """
+        if not isinstance(data, dict):
+            raise TypeError(f"Event must be an object, got {type(data).__name__}")
+        for key in ("timestamp", "source_type", "host", "message"):
+            if not isinstance(data.get(key), str):
+                raise TypeError(f"Event field '{key}' must be a string")
+        raw_data = data.get("raw_data") or {}
+        if not isinstance(raw_data, dict):
+            raise TypeError("Event field 'raw_data' must be an object")
+
+        return cls(
+            timestamp=datetime.datetime.fromisoformat(data["timestamp"]),
+            source_type=data["source_type"],
+            host=data["host"],
+            message=data["message"],
+            raw_data=raw_data
+        )
 
 class Collector(abc.ABC):
     """
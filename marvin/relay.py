@@ -0,0 +1,180 @@
+"""
+Wire protocol shared by the relay sink (agent side) and the relay collector
+(aggregator side).
+
+Every frame is a 5-byte header followed by a payload:
+
+    type (1 byte) | payload length (4 bytes, big-endian) | payload
+
+HELLO  - JSON object identifying the agent: {"agent_id", "session", "version"}
+         plus "auth_token" when the agent is configured with one
+BATCH  - sequence number (8 bytes) | SHA-256 of body (32 bytes) | body
+         where body is a zlib-compressed JSON array of LogEvent dictionaries
+ACK    - sequence number (8 bytes) | SHA-256 of the accepted body (32 bytes)
+NACK   - sequence number (8 bytes) | permanent flag (1 byte) | UTF-8 reason
+
+A permanent NACK means the batch can never be accepted and the agent should
+drop it; otherwise the agent reconnects and resends it.
+"""
+import asyncio
+import hashlib
+import json
+import struct
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from marvin.core import LogEvent
+
+PROTOCOL_VERSION = 1
+
+FRAME_HELLO = 1
+FRAME_BATCH = 2
+FRAME_ACK = 3
+FRAME_NACK = 4
+
+HEADER = struct.Struct('!BI')
+SEQUENCE = struct.Struct('!Q')
+DIGEST_SIZE = hashlib.sha256().digest_size
+
+DEFAULT_MAX_FRAME_SIZE = 16 * 1024 * 1024
+DEFAULT_MAX_BATCH_SIZE = 128 * 1024 * 1024
+
+class RelayProtocolError(Exception):
+    pass
+
+class RelayRejectedError(RelayProtocolError):
+    """
+    A batch was refused. Permanent rejections will fail again if resent.
+    """
+    def __init__(self, message: str, permanent: bool = True):
+        super().__init__(message)
+        self.permanent = permanent
+
+class FrameTooLargeError(RelayProtocolError):
+    """
+    Raised by read_frame before the oversized payload is read, so the caller can discard it.
+    """
+    def __init__(self, frame_type: int, length: int, max_size: int):
+        super().__init__(f"Frame of {length} bytes exceeds limit of {max_size}")
+        self.frame_type = frame_type
+        self.length = length
+
+def encode_frame(frame_type: int, payload: bytes) -> bytes:
+    """
+    Prefix a payload with its frame header.
+    """
+    return HEADER.pack(frame_type, len(payload)) + payload
+
+async def read_frame(reader: asyncio.StreamReader,
+                     max_size: int = DEFAULT_MAX_FRAME_SIZE) -> Tuple[int, bytes]:
+    """
+    Read one frame from the stream. Raises asyncio.IncompleteReadError on EOF.
+    """
+    header = await reader.readexactly(HEADER.size)
+    frame_type, length = HEADER.unpack(header)
+    if length > max_size:
+        raise FrameTooLargeError(frame_type, length, max_size)
+    payload = await reader.readexactly(length)
+    return frame_type, payload
+
+async def discard_payload(reader: asyncio.StreamReader, length: int) -> bytes:
+    """
+    Skip an oversized payload without buffering it. Returns its leading
+    bytes so the batch sequence number can still be recovered.
+    """
+    head = await reader.readexactly(min(length, SEQUENCE.size))
+    remaining = length - len(head)
+    while remaining:
+        chunk = await reader.readexactly(min(remaining, 64 * 1024))
+        remaining -= len(chunk)
+    return head
+
+def peek_sequence(payload: bytes) -> int:
+    """
+    Best-effort sequence number of a BATCH payload, for use in a NACK.
+    """
+    return SEQUENCE.unpack_from(payload)[0] if len(payload) >= SEQUENCE.size else 0
+
+def encode_hello(agent_id: str, session: str, auth_token: Optional[str] = None) -> bytes:
+    hello = {
+        "agent_id": agent_id,
+        "session": session,
+        "version": PROTOCOL_VERSION
+    }
+    if auth_token:
+        hello["auth_token"] = auth_token
+    return encode_frame(FRAME_HELLO, json.dumps(hello).encode('utf-8'))
+
+def decode_hello(payload: bytes) -> Dict[str, Any]:
+    try:
+        hello = json.loads(payload.decode('utf-8'))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise RelayProtocolError(f"Malformed HELLO: {e}")
+    if not isinstance(hello, dict) or not hello.get('agent_id'):
+        raise RelayProtocolError("HELLO missing 'agent_id'")
+    if not isinstance(hello['agent_id'], str) or not isinstance(hello.get('session', ''), str):
+        raise RelayProtocolError("HELLO 'agent_id' and 'session' must be strings")
+    if hello.get('version') != PROTOCOL_VERSION:
+        raise RelayProtocolError(f"Unsupported protocol version: {hello.get('version')}")
+    return hello
+
+def encode_batch(sequence: int, events: List[LogEvent], level: int = 6) -> Tuple[bytes, str]:
+    """
+    Build a BATCH frame. Returns the frame and the hex SHA-256 of its body.
+    """
+    body = zlib.compress(
+        json.dumps([event.to_dict() for event in events], default=str).encode('utf-8'),
+        level
+    )
+    digest = hashlib.sha256(body).digest()
+    return encode_frame(FRAME_BATCH, SEQUENCE.pack(sequence) + digest + body), digest.hex()
+
+def decode_batch(payload: bytes,
+                 max_size: int = DEFAULT_MAX_BATCH_SIZE) -> Tuple[int, str, List[LogEvent]]:
+    """
+    Verify and unpack a BATCH payload. Returns (sequence, hex digest, events).
+    max_size bounds the decompressed body.
+    """
+    prefix = SEQUENCE.size + DIGEST_SIZE
+    if len(payload) < prefix:
+        raise RelayRejectedError("Truncated BATCH")
+    (sequence,) = SEQUENCE.unpack_from(payload)
+    digest = payload[SEQUENCE.size:prefix]
+    body = payload[prefix:]
+    if hashlib.sha256(body).digest() != digest:
+        # Likely corrupted in transit, so worth resending
+        raise RelayRejectedError(f"Digest mismatch on batch {sequence}", permanent=False)
+    try:
+        decompressor = zlib.decompressobj()
+        data = decompressor.decompress(body, max_size)
+        if decompressor.unconsumed_tail:
+            raise RelayRejectedError(f"Batch {sequence} exceeds {max_size} bytes decompressed")
+        records = json.loads(data.decode('utf-8'))
+        if not isinstance(records, list):
+            raise TypeError("Batch body must be an array")
+        events = [LogEvent.from_dict(record) for record in records]
+        for event in events:
+            if not isinstance(event.raw_data.get('relay_provenance', []), list):
+                raise TypeError("Event field 'relay_provenance' must be an array")
+    except (zlib.error, UnicodeDecodeError, json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+        raise RelayRejectedError(f"Malformed batch {sequence}: {e}")
+    return sequence, digest.hex(), events
+
+def encode_ack(sequence: int, digest: str) -> bytes:
+    return encode_frame(FRAME_ACK, SEQUENCE.pack(sequence) + bytes.fromhex(digest))
+
+def decode_ack(payload: bytes) -> Tuple[int, str]:
+    if len(payload) != SEQUENCE.size + DIGEST_SIZE:
+        raise RelayProtocolError("Malformed ACK")
+    (sequence,) = SEQUENCE.unpack_from(payload)
+    return sequence, payload[SEQUENCE.size:].hex()
+
+def encode_nack(sequence: int, reason: str, permanent: bool = True) -> bytes:
+    return encode_frame(FRAME_NACK, SEQUENCE.pack(sequence) + bytes([permanent]) + reason.encode('utf-8'))
+
+def decode_nack(payload: bytes) -> Tuple[int, bool, str]:
+    if len(payload) < SEQUENCE.size + 1:
+        raise RelayProtocolError("Malformed NACK")
+    (sequence,) = SEQUENCE.unpack_from(payload)
+    permanent = bool(payload[SEQUENCE.size])
+    return sequence, permanent, payload[SEQUENCE.size + 1:].decode('utf-8', errors='replace')
@@ -1,3 +1,4 @@
 from .stdout import StdoutSink
 from .file import FileSink
 from .http import HTTPSink
+from .relay import RelaySink
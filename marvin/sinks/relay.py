@@ -0,0 +1,199 @@
+import asyncio
+import socket
+import uuid
+from typing import Dict, Any, List, Optional, Tuple
+
+from marvin.core import Sink, LogEvent
+from marvin import relay
+
+class RelaySink(Sink):
+    """
+    Forwards events to another Marvin instance running a relay collector.
+
+    Events are buffered and shipped as compressed batches over a persistent
+    TCP connection. Each batch is held until the aggregator acknowledges it
+    with a matching digest, and is resent after a reconnect otherwise.
+    """
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.host = config.get('host', '127.0.0.1')
+        self.port = config.get('port', 5140)
+        self.agent_id = config.get('agent_id', socket.gethostname())
+        self.batch_size = config.get('batch_size', 500)
+        self.flush_interval = config.get('flush_interval', 1.0)
+        self.max_buffer = config.get('max_buffer', 100000)
+        self.compression_level = config.get('compression_level', 6)
+        self.timeout = config.get('timeout', 10)
+        self.retry_interval = config.get('retry_interval', 2.0)
+        self.max_frame_size = config.get('max_frame_size', relay.DEFAULT_MAX_FRAME_SIZE)
+        self.auth_token = config.get('auth_token')
+
+        self.session = uuid.uuid4().hex
+        self.sequence = 0
+        self.buffer: List[LogEvent] = []
+        # (sequence, events, frame, digest) of the batch awaiting acknowledgement
+        self.pending: Optional[Tuple[int, List[LogEvent], bytes, str]] = None
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.lock = asyncio.Lock()
+        self.flush_task = None
+        self.retry_at = 0.0
+        # Batch size cap while re-sending the events of a rejected batch
+        self.split_limit = self.batch_size
+        self.split_remaining = 0
+
+    async def start(self):
+        if self.flush_task is None:
+            self.flush_task = asyncio.create_task(self._flush_loop())
+
+    async def write(self, event: LogEvent):
+        if self.flush_task is None:
+            await self.start()
+
+        self.buffer.append(event)
+        if len(self.buffer) > self.max_buffer:
+            dropped = len(self.buffer) - self.max_buffer
+            del self.buffer[:dropped]
+            self.split_remaining = max(0, self.split_remaining - dropped)
+            print(f"Warning: Relay buffer full, dropped {dropped} oldest events")
+
+        if len(self.buffer) >= self.batch_size and not self.lock.locked() and self._can_retry():
+            await self.flush()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if self._can_retry():
+                await self.flush()
+
+    def _can_retry(self) -> bool:
+        return asyncio.get_running_loop().time() >= self.retry_at
+
+    async def flush(self):
+        """
+        Ship buffered events until the buffer is empty or the aggregator is unreachable.
+        """
+        async with self.lock:
+            while self.pending or self.buffer:
+                if not self.pending and not self._next_batch():
+                    continue
+                sequence, batch, frame, digest = self.pending
+                try:
+                    await self._send_batch(sequence, frame, digest)
+                except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, relay.RelayProtocolError) as e:
+                    if isinstance(e, relay.RelayRejectedError) and e.permanent:
+                        # Resending would fail the same way and block every later batch
+                        self._split_rejected(batch, e)
+                    else:
+                        print(f"Exception sending to relay {self.host}:{self.port}: {e!r}")
+                        await self._disconnect()
+                        self.retry_at = asyncio.get_running_loop().time() + self.retry_interval
+                        return
+                self.pending = None
+
+    def _next_batch(self) -> bool:
+        """
+        Encode the next batch from the buffer into self.pending, halving it
+        until the frame fits max_frame_size. Returns False if the head event
+        alone is too large and was dropped instead.
+        """
+        count = min(self.batch_size, len(self.buffer))
+        if self.split_remaining:
+            count = min(count, self.split_limit)
+        while True:
+            # Pin the batch to its sequence number so a resend carries identical content
+            frame, digest = relay.encode_batch(self.sequence + 1, self.buffer[:count], self.compression_level)
+            if len(frame) - relay.HEADER.size <= self.max_frame_size:
+                break
+            if count == 1:
+                print(f"Error: Event of {len(frame)} bytes exceeds relay frame limit, dropping it")
+                del self.buffer[:1]
+                self.split_remaining = max(0, self.split_remaining - 1)
+                return False
+            count //= 2
+
+        self.sequence += 1
+        self.pending = (self.sequence, self.buffer[:count], frame, digest)
+        del self.buffer[:count]
+        self.split_remaining = max(0, self.split_remaining - count)
+        return True
+
+    def _split_rejected(self, batch: List[LogEvent], error: Exception):
+        """
+        Requeue a permanently rejected batch to be resent in halves, so only
+        the events the relay refuses on their own are dropped.
+        """
+        if len(batch) == 1:
+            print(f"Error: Relay {self.host}:{self.port} rejected an event, dropping it: {error}")
+            return
+
+        print(f"Warning: Relay {self.host}:{self.port} rejected {len(batch)} events, resending in smaller batches: {error}")
+        half = len(batch) // 2
+        self.split_limit = min(self.split_limit, half) if self.split_remaining else half
+        self.split_remaining += len(batch)
+        self.buffer[:0] = batch
+
+    async def _connect(self):
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port),
+            timeout=self.timeout
+        )
+        self.writer.write(relay.encode_hello(self.agent_id, self.session, self.auth_token))
+        await self.writer.drain()
+
+    async def _disconnect(self):
+        if self.writer:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = None
+        self.writer = None
+
+    async def _send_batch(self, sequence: int, frame: bytes, digest: str):
+        if not self.writer:
+            await self._connect()
+
+        self.writer.write(frame)
+        await self.writer.drain()
+
+        while True:
+            frame_type, payload = await asyncio.wait_for(relay.read_frame(self.reader), timeout=self.timeout)
+            if frame_type == relay.FRAME_NACK:
+                acked, permanent, reason = relay.decode_nack(payload)
+                raise relay.RelayRejectedError(f"Batch {acked} rejected: {reason}", permanent)
+            if frame_type != relay.FRAME_ACK:
+                raise relay.RelayProtocolError(f"Unexpected frame type {frame_type}")
+
+            acked, acked_digest = relay.decode_ack(payload)
+            # Skip acknowledgements left over from earlier sends of already-accepted batches
+            if acked < sequence:
+                continue
+            break
+
+        if acked != sequence or acked_digest != digest:
+            raise relay.RelayProtocolError(f"Acknowledgement mismatch for batch {sequence}")
+
+    async def close(self):
+        if self.flush_task:
+            # Hold the lock so the task is never cancelled mid-batch with an ACK outstanding
+            async with self.lock:
+                self.flush_task.cancel()
+                try:
+                    await self.flush_task
+                except asyncio.CancelledError:
+                    pass
+            self.flush_task = None
+
+        # Final attempt to drain anything still buffered
+        for attempt in range(3):
+            await self.flush()
+            if not self.pending and not self.buffer:
+                break
+            await asyncio.sleep(self.retry_interval)
+
+        undelivered = len(self.buffer) + (len(self.pending[1]) if self.pending else 0)
+        if undelivered:
+            print(f"Warning: {undelivered} events not delivered to relay {self.host}:{self.port}")
+        await self._disconnect()